@@ -1,14 +1,18 @@
+from collections import defaultdict
 import math
+import operator
+import re
 from enum import Enum, auto
-from dataclasses import dataclass
-from typing import List, Optional, Dict, Tuple
+from typing import ClassVar, Iterable, List, Optional, Dict, Tuple, Union
 import colorama
 from colorama import Fore, Back, Style
 import time
+import types
 from rich.console import Console
 from rich.table import Table
 from rich.panel import Panel
 from rich.syntax import Syntax
+from rich.text import Text
 from rich import box
 
 # Initialize colorama for cross-platform colored terminal output
@@ -55,283 +59,405 @@ class TokenType(Enum):
     UNKNOWN = auto()
 
 
-@dataclass
+# Enum .name goes through a descriptor on every access; printing paths use this instead
+_TT_NAME = {member: member.name for member in TokenType}
+
+# Lookup tables and patterns shared by every Lexer/Calculator instance
+_KEYWORDS = {
+    "def": TokenType.FUNCTION, "extern": TokenType.EXTERN,
+    "if": TokenType.IF, "then": TokenType.THEN, "else": TokenType.ELSE,
+    "for": TokenType.FOR, "in": TokenType.IN
+}
+
+_SINGLE_CHAR = {
+    "+": TokenType.PLUS, "-": TokenType.MINUS, "*": TokenType.MULTIPLY,
+    "/": TokenType.DIVIDE, "%": TokenType.MODULO, "^": TokenType.POWER,
+    "<": TokenType.LESS, ">": TokenType.GREATER, "=": TokenType.EQUAL,
+    "(": TokenType.LEFT_PAREN, ")": TokenType.RIGHT_PAREN,
+    ",": TokenType.COMMA, ";": TokenType.SEMICOLON,
+}
+
+_IDENT_RE = re.compile(r'[A-Za-z_][A-Za-z0-9_]*')
+_FLOAT_RE = re.compile(r'\d+\.\d+|\.\d+')
+_INTEGER_RE = re.compile(r'\d+')
+_COMMENT_RE = re.compile(r'\#[^\n]*')
+
+# Single alternation regex so the whole scan runs inside the regex engine
+_MASTER_RE = re.compile(
+    # Whitespace and comments in one greedy run, so a commented block is a single match
+    rf"(?P<SKIP>(?:\s+|{_COMMENT_RE.pattern})+)"
+    rf"|(?P<IDENT>{_IDENT_RE.pattern})"
+    # FLOAT before INTEGER so the regex engine, not Python, tells them apart
+    rf"|(?P<FLOAT>{_FLOAT_RE.pattern})"
+    rf"|(?P<INTEGER>{_INTEGER_RE.pattern})"
+    r"|(?P<NE>!=)"
+    r"|(?P<OP>[+\-*/%^<>=(),;])"
+    r"|(?P<UNKNOWN>.)"
+)
+
+_NEWLINE_RE = re.compile(r'\n')
+
+# Group indices for dispatching on match.lastindex instead of group names
+_SKIP = _MASTER_RE.groupindex["SKIP"]
+_IDENT = _MASTER_RE.groupindex["IDENT"]
+_FLOAT = _MASTER_RE.groupindex["FLOAT"]
+_INTEGER = _MASTER_RE.groupindex["INTEGER"]
+_NE = _MASTER_RE.groupindex["NE"]
+_OP = _MASTER_RE.groupindex["OP"]
+
+# Map of supported functions and their implementations
+_FUNCTIONS = {
+    "sin": math.sin,
+    "cos": math.cos,
+    "tan": math.tan,
+    "sqrt": math.sqrt,
+    "log": math.log10,
+    "ln": math.log,
+    "abs": abs,
+    "pow": pow
+}
+
+
 class Token:
-    type: TokenType
-    value: str
-    line: int
-    column: int
+    # Slots instead of a per-instance __dict__: tokens are created in bulk
+    __slots__ = ('type', 'value', 'line', 'column')
+    
+    _TYPE_COLORS: ClassVar[Dict[TokenType, str]] = {
+        # Keywords - cyan
+        TokenType.FUNCTION: Fore.CYAN,
+        TokenType.EXTERN: Fore.CYAN,
+        TokenType.IF: Fore.CYAN,
+        TokenType.THEN: Fore.CYAN,
+        TokenType.ELSE: Fore.CYAN,
+        TokenType.FOR: Fore.CYAN,
+        TokenType.IN: Fore.CYAN,
+        
+        # Literals - green
+        TokenType.INTEGER: Fore.GREEN,
+        TokenType.FLOAT: Fore.GREEN,
+        TokenType.IDENTIFIER: Fore.WHITE,
+        
+        # Operators - yellow
+        TokenType.PLUS: Fore.YELLOW,
+        TokenType.MINUS: Fore.YELLOW,
+        TokenType.MULTIPLY: Fore.YELLOW,
+        TokenType.DIVIDE: Fore.YELLOW,
+        TokenType.MODULO: Fore.YELLOW,
+        TokenType.POWER: Fore.YELLOW,
+        
+        # Comparison - magenta
+        TokenType.LESS: Fore.MAGENTA,
+        TokenType.GREATER: Fore.MAGENTA,
+        TokenType.EQUAL: Fore.MAGENTA,
+        TokenType.NOT_EQUAL: Fore.MAGENTA,
+        
+        # Punctuation - blue
+        TokenType.LEFT_PAREN: Fore.BLUE,
+        TokenType.RIGHT_PAREN: Fore.BLUE,
+        TokenType.COMMA: Fore.BLUE,
+        TokenType.SEMICOLON: Fore.BLUE,
+        
+        # Special
+        TokenType.EOF: Fore.RED,
+        TokenType.UNKNOWN: Fore.RED,
+    }
+    
+    def __init__(self, type: TokenType, value: str, line: int, column: int):
+        self.type = type
+        self.value = value
+        self.line = line
+        self.column = column
+    
+    def __repr__(self) -> str:
+        return f"Token(type={self.type!r}, value={self.value!r}, line={self.line!r}, column={self.column!r})"
+    
+    def __eq__(self, other) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return (self.type, self.value, self.line, self.column) == (other.type, other.value, other.line, other.column)
+    
+    __hash__ = None
     
     def __str__(self) -> str:
-        return f"Token(type={self.type.name}, value='{self.value}', position=({self.line}, {self.column}))"
+        return f"Token(type={_TT_NAME[self.type]}, value='{self.value}', position=({self.line}, {self.column}))"
 
     def colored_str(self) -> str:
         """Return a colored string representation based on token type."""
-        type_colors = {
-            # Keywords - cyan
-            TokenType.FUNCTION: Fore.CYAN,
-            TokenType.EXTERN: Fore.CYAN,
-            TokenType.IF: Fore.CYAN,
-            TokenType.THEN: Fore.CYAN,
-            TokenType.ELSE: Fore.CYAN,
-            TokenType.FOR: Fore.CYAN,
-            TokenType.IN: Fore.CYAN,
-            
-            # Literals - green
-            TokenType.INTEGER: Fore.GREEN,
-            TokenType.FLOAT: Fore.GREEN,
-            TokenType.IDENTIFIER: Fore.WHITE,
-            
-            # Operators - yellow
-            TokenType.PLUS: Fore.YELLOW,
-            TokenType.MINUS: Fore.YELLOW,
-            TokenType.MULTIPLY: Fore.YELLOW,
-            TokenType.DIVIDE: Fore.YELLOW,
-            TokenType.MODULO: Fore.YELLOW,
-            TokenType.POWER: Fore.YELLOW,
-            
-            # Comparison - magenta
-            TokenType.LESS: Fore.MAGENTA,
-            TokenType.GREATER: Fore.MAGENTA,
-            TokenType.EQUAL: Fore.MAGENTA,
-            TokenType.NOT_EQUAL: Fore.MAGENTA,
-            
-            # Punctuation - blue
-            TokenType.LEFT_PAREN: Fore.BLUE,
-            TokenType.RIGHT_PAREN: Fore.BLUE,
-            TokenType.COMMA: Fore.BLUE,
-            TokenType.SEMICOLON: Fore.BLUE,
-            
-            # Special
-            TokenType.EOF: Fore.RED,
-            TokenType.UNKNOWN: Fore.RED,
-        }
-        color = type_colors.get(self.type, Fore.WHITE)
-        return f"{color}Token(type={Style.BRIGHT}{self.type.name}{Style.NORMAL}, " \
+        color = self._TYPE_COLORS.get(self.type, Fore.WHITE)
+        return f"{color}Token(type={Style.BRIGHT}{_TT_NAME[self.type]}{Style.NORMAL}, " \
                f"value='{self.value}', " \
                f"position=({self.line}, {self.column})){Style.RESET_ALL}"
 
 
+class TokenBuffer:
+    """Token stream stored as parallel lists rather than one Token object per entry.
+
+    Indexing and iteration build Token views on demand for display code; the
+    calculator reads the lists directly. Slicing returns a new TokenBuffer.
+    """
+    __slots__ = ('types', 'values', 'lines', 'columns')
+    
+    def __init__(self):
+        self.types: List[TokenType] = []
+        self.values: List[str] = []
+        self.lines: List[int] = []
+        self.columns: List[int] = []
+    
+    def append(self, token_type: TokenType, value: str, line: int, column: int):
+        self.types.append(token_type)
+        self.values.append(value)
+        self.lines.append(line)
+        self.columns.append(column)
+    
+    @classmethod
+    def from_tokens(cls, tokens: Iterable[Token]) -> "TokenBuffer":
+        buffer = cls()
+        for token in tokens:
+            buffer.append(token.type, token.value, token.line, token.column)
+        return buffer
+    
+    def __len__(self) -> int:
+        return len(self.types)
+    
+    def __getitem__(self, index: Union[int, slice]) -> Union[Token, "TokenBuffer"]:
+        if isinstance(index, slice):
+            sliced = TokenBuffer()
+            sliced.types = self.types[index]
+            sliced.values = self.values[index]
+            sliced.lines = self.lines[index]
+            sliced.columns = self.columns[index]
+            return sliced
+        return Token(self.types[index], self.values[index], self.lines[index], self.columns[index])
+    
+    def __iter__(self):
+        return map(Token, self.types, self.values, self.lines, self.columns)
+
+
 class Lexer:
     def __init__(self, source: str):
         self.source = source
-        self.position = 0
-        self.line = 1
-        self.column = 1
-        self.tokens = []
-        
-        # Optimized keyword lookup
-        self.keywords = {
-            "def": TokenType.FUNCTION, "extern": TokenType.EXTERN,
-            "if": TokenType.IF, "then": TokenType.THEN, "else": TokenType.ELSE,
-            "for": TokenType.FOR, "in": TokenType.IN
-        }
-
-        self.single_char_tokens = {
-            "+": TokenType.PLUS, "-": TokenType.MINUS, "*": TokenType.MULTIPLY,
-            "/": TokenType.DIVIDE, "%": TokenType.MODULO, "^": TokenType.POWER,
-            "<": TokenType.LESS, ">": TokenType.GREATER, "=": TokenType.EQUAL,
-            "(": TokenType.LEFT_PAREN, ")": TokenType.RIGHT_PAREN,
-            ",": TokenType.COMMA, ";": TokenType.SEMICOLON,
-        }
-        
-        # Pre-compile regular expressions for better performance
-        self.identifier_regex = re.compile(r'[a-zA-Z_][a-zA-Z0-9_]*')
-        self.number_regex = re.compile(r'\d+(\.\d+)?')
+        self.tokens = TokenBuffer()
 
-    def is_at_end(self) -> bool:
-        return self.position >= len(self.source)
+    def add_token(self, token_type: TokenType, value: str, line: int, column: int):
+        self.tokens.append(token_type, value or _TT_NAME[token_type], line, column)
 
-    def advance(self) -> str:
-        if self.is_at_end():
-            return ''
-        char = self.source[self.position]
-        self.position += 1
-        self.column += 1
+    def scan_tokens(self) -> Tuple[TokenBuffer, float]:
+        start_time = time.perf_counter_ns()
+        
+        # Hot-loop attribute lookups bound to locals once
+        source = self.source
+        # Offsets of every newline, so line/column are only computed per token
+        newlines = [match.start() for match in _NEWLINE_RE.finditer(source)]
+        append_type = self.tokens.types.append
+        append_value = self.tokens.values.append
+        append_line = self.tokens.lines.append
+        append_column = self.tokens.columns.append
+        
+        # Tokens arrive in source order, so a forward cursor over the newline
+        # offsets replaces a per-token bisect
+        past_end = len(source) + 1
+        next_newline_iter = iter(newlines)
+        next_newline = next(next_newline_iter, past_end)
+        line, line_start = 1, 0
+        for match in _MASTER_RE.finditer(source):
+            kind = match.lastindex
+            
+            # Checks are ordered by how often each kind shows up in source text
+            if kind == _SKIP:
+                continue
+            
+            value = match.group()
+            
+            if kind == _IDENT:
+                token_type = _KEYWORDS.get(value, TokenType.IDENTIFIER)
+            elif kind == _OP:
+                token_type = _SINGLE_CHAR[value]
+            elif kind == _INTEGER:
+                token_type = TokenType.INTEGER
+            elif kind == _FLOAT:
+                token_type = TokenType.FLOAT
+            elif kind == _NE:
+                token_type = TokenType.NOT_EQUAL
+            else:
+                token_type = TokenType.UNKNOWN
+            
+            start = match.start()
+            while next_newline < start:
+                line += 1
+                line_start = next_newline + 1
+                next_newline = next(next_newline_iter, past_end)
+            append_type(token_type)
+            append_value(value)
+            append_line(line)
+            append_column(start - line_start + 1)
+        
+        # EOF sits just past the last character; the cursor only has to reach it
+        end = len(source)
+        while next_newline < end:
+            line += 1
+            line_start = next_newline + 1
+            next_newline = next(next_newline_iter, past_end)
+        self.add_token(TokenType.EOF, "", line, end - line_start + 1)
+        scan_time = (time.perf_counter_ns() - start_time) / 1e6  # Convert to milliseconds
+        
+        return self.tokens, scan_time
 
-        if char == '\n':
-            self.line += 1
-            self.column = 1
 
-        return char
+# Binding power of each binary operator; higher binds tighter
+_PREC = {
+    TokenType.PLUS: 10, TokenType.MINUS: 10,
+    TokenType.MULTIPLY: 20, TokenType.DIVIDE: 20, TokenType.MODULO: 20,
+    TokenType.POWER: 30,
+}
 
-    def peek(self) -> str:
-        return self.source[self.position] if not self.is_at_end() else ''
+_RIGHT_ASSOC = frozenset({TokenType.POWER})
 
-    def peek_next(self) -> str:
-        return self.source[self.position + 1] if self.position + 1 < len(self.source) else ''
+_NUMBER_TYPES = frozenset({TokenType.INTEGER, TokenType.FLOAT})
+_ARITHMETIC_OPS = frozenset(_PREC)
 
-    def match(self, expected: str) -> bool:
-        if self.is_at_end() or self.source[self.position] != expected:
-            return False
-        self.position += 1
-        self.column += 1
-        return True
 
-    def add_token(self, token_type: TokenType, value: str = ""):
-        self.tokens.append(Token(token_type, value or token_type.name, self.line, self.column - len(value)))
+# Binary operators dispatched straight to their C implementations
+_BINOP = {
+    TokenType.PLUS: operator.add,
+    TokenType.MINUS: operator.sub,
+    TokenType.MULTIPLY: operator.mul,
+    TokenType.DIVIDE: operator.truediv,
+    TokenType.MODULO: operator.mod,
+    TokenType.POWER: operator.pow,
+}
 
-    def scan_tokens(self) -> List[Token]:
-        start_time = time.time()
-        
-        while not self.is_at_end():
-            self.scan_token()
-        
-        self.add_token(TokenType.EOF)
-        end_time = time.time()
-        scan_time = (end_time - start_time) * 1000  # Convert to milliseconds
-        
-        return self.tokens, scan_time
+# The same operators as Python source, for expressions compiled to code objects
+_PY_BINOP = {
+    TokenType.PLUS: "+",
+    TokenType.MINUS: "-",
+    TokenType.MULTIPLY: "*",
+    TokenType.DIVIDE: "/",
+    TokenType.MODULO: "%",
+    TokenType.POWER: "**",
+}
 
-    def scan_token(self):
-        char = self.advance()
-
-        if char.isspace():
-            return
-        elif char == '#':  # Comment handling
-            while self.peek() not in '\n' and not self.is_at_end():
-                self.advance()
-            return
-        elif char in self.single_char_tokens:
-            if char == '!' and self.match('='):
-                self.add_token(TokenType.NOT_EQUAL, "!=")
-            else:
-                self.add_token(self.single_char_tokens[char], char)
-            return
-        elif char.isalpha() or char == '_':
-            self.identifier()
-            return
-        elif char.isdigit() or (char == '.' and self.peek().isdigit()):
-            self.number()
-            return
-
-        self.add_token(TokenType.UNKNOWN, char)
-
-    def identifier(self):
-        # Start from previous position as we've already advanced
-        match = self.identifier_regex.match(self.source[self.position - 1:])
-        if match:
-            identifier = match.group(0)
-            # Adjust position (account for the first character we've already advanced)
-            self.position = self.position - 1 + len(identifier)
-            self.column = self.column - 1 + len(identifier)
-            token_type = self.keywords.get(identifier, TokenType.IDENTIFIER)
-            self.add_token(token_type, identifier)
-
-    def number(self):
-        match = self.number_regex.match(self.source[self.position - 1:])
-        if match:
-            num_str = match.group(0)
-            # Adjust position (account for the first character we've already advanced)
-            self.position = self.position - 1 + len(num_str)
-            self.column = self.column - 1 + len(num_str)
-            self.add_token(TokenType.FLOAT if '.' in num_str else TokenType.INTEGER, num_str)
+# Expressions keyed by their token types and values, oldest evicted first.
+# None marks an expression seen once; it is compiled when seen again. False marks
+# one CPython cannot compile (nesting limits), which is always evaluated directly.
+_expr_cache: Dict[Tuple[Tuple[int, ...], Tuple[str, ...]], Union[None, bool, types.CodeType]] = {}
+_EXPR_CACHE_SIZE = 256
 
+# Evaluation runs with no builtins; only _FUNCTIONS is visible to the expression
+_EVAL_GLOBALS = {"__builtins__": {}}
 
-import re
 
 class Calculator:
-    def __init__(self, tokens: List[Token]):
+    """Evaluates a token stream; a plain iterable of Token is converted to a TokenBuffer."""
+
+    def __init__(self, tokens: Union[TokenBuffer, Iterable[Token]]):
+        if not isinstance(tokens, TokenBuffer):
+            tokens = TokenBuffer.from_tokens(tokens)
         self.tokens = tokens
+        self.types = tokens.types
+        self.values = tokens.values
         self.pos = 0
-        # Map of supported functions and their implementations
-        self.functions = {
-            "sin": math.sin,
-            "cos": math.cos,
-            "tan": math.tan,
-            "sqrt": math.sqrt,
-            "log": math.log10,
-            "ln": math.log,
-            "abs": abs,
-            "pow": pow
-        }
+        self._emit = False  # True while _parse builds Python source instead of values
 
     def calculate(self) -> Tuple[Optional[float], float]:
-        start_time = time.time()
-        result = self.expression()
-        end_time = time.time()
-        calc_time = (end_time - start_time) * 1000  # Convert to milliseconds
+        start_time = time.perf_counter_ns()
+        # Enum members hash through a Python-level __hash__; their ids (the members
+        # are singletons) hash in C, which keeps the key cheap on long inputs
+        key = (tuple(map(id, self.types)), tuple(self.values))
+        if key not in _expr_cache:
+            # First sighting: a direct evaluation is cheaper than compiling
+            result = self._parse()
+            if len(_expr_cache) >= _EXPR_CACHE_SIZE:
+                del _expr_cache[next(iter(_expr_cache))]
+            _expr_cache[key] = None
+        else:
+            code = _expr_cache[key]
+            if code is None:
+                try:
+                    code = self._compile()
+                except (SyntaxError, RecursionError, MemoryError):
+                    # CPython's compiler limits nesting depth; the parser has no such limit
+                    code = False
+                _expr_cache[key] = code
+            if code is False:
+                self.pos = 0
+                result = self._parse()
+            else:
+                result = eval(code, _EVAL_GLOBALS, _FUNCTIONS)
+        calc_time = (time.perf_counter_ns() - start_time) / 1e6  # Convert to milliseconds
         return result, calc_time
 
-    def expression(self):
-        return self.term()
-
-    def term(self):
-        left = self.factor()
-        
-        while self.pos < len(self.tokens) and self.tokens[self.pos].type in [TokenType.PLUS, TokenType.MINUS]:
-            op = self.tokens[self.pos]
-            self.pos += 1
-            right = self.factor()
-            
-            if op.type == TokenType.PLUS:
-                left += right
-            elif op.type == TokenType.MINUS:
-                left -= right
-                
-        return left
-
-    def factor(self):
-        left = self.power()
-        
-        while self.pos < len(self.tokens) and self.tokens[self.pos].type in [TokenType.MULTIPLY, TokenType.DIVIDE, TokenType.MODULO]:
-            op = self.tokens[self.pos]
-            self.pos += 1
-            right = self.power()
-            
-            if op.type == TokenType.MULTIPLY:
-                left *= right
-            elif op.type == TokenType.DIVIDE:
-                if right == 0:
-                    raise ZeroDivisionError("Division by zero")
-                left /= right
-            elif op.type == TokenType.MODULO:
-                if right == 0:
-                    raise ZeroDivisionError("Modulo by zero")
-                left %= right
-                
-        return left
-
-    def power(self):
-        left = self.primary()
+    def _compile(self) -> types.CodeType:
+        """Parse the tokens into a code object instead of evaluating them."""
+        self.pos = 0
+        self._emit = True
+        try:
+            return compile(self._parse(), "<calc>", "eval")
+        finally:
+            self._emit = False
+
+    def _check(self, token_type: TokenType) -> bool:
+        return self.pos < len(self.types) and self.types[self.pos] == token_type
+
+    def _parse(self, min_prec: int = 0):
+        """Precedence-climbing loop; returns a value, or Python source while emitting.
+
+        Emitted source needs no parentheses: operator precedence and
+        associativity here are exactly Python's, so it parses to the same tree.
+        """
+        token_types = self.types
+        emit = self._emit
+        end = len(token_types)
+        left = self._primary()
         
-        if self.pos < len(self.tokens) and self.tokens[self.pos].type == TokenType.POWER:
+        while self.pos < end:
+            op_type = token_types[self.pos]
+            prec = _PREC.get(op_type, -1)
+            if prec < min_prec:
+                break
             self.pos += 1
-            right = self.power()  # Right associative
-            return left ** right
+            right = self._parse(prec if op_type in _RIGHT_ASSOC else prec + 1)
+            if emit:
+                left = f"{left} {_PY_BINOP[op_type]} {right}"
+            else:
+                left = _BINOP[op_type](left, right)
             
         return left
 
-    def primary(self):
-        if self.pos >= len(self.tokens):
+    def _primary(self):
+        if self.pos >= len(self.types) or self.types[self.pos] == TokenType.EOF:
             raise SyntaxError("Unexpected end of expression")
             
-        token = self.tokens[self.pos]
+        token_type = self.types[self.pos]
+        value = self.values[self.pos]
         self.pos += 1
         
-        if token.type == TokenType.INTEGER:
-            return int(token.value)
-        elif token.type == TokenType.FLOAT:
-            return float(token.value)
-        elif token.type == TokenType.IDENTIFIER:
+        if token_type == TokenType.INTEGER:
+            if self._emit:
+                return str(int(value))  # Normalises leading zeros, which Python rejects
+            return int(value)
+        elif token_type == TokenType.FLOAT:
+            return repr(float(value)) if self._emit else float(value)
+        elif token_type == TokenType.IDENTIFIER:
             # Handle functions
-            if token.value in self.functions:
-                if self.pos < len(self.tokens) and self.tokens[self.pos].type == TokenType.LEFT_PAREN:
+            if value in _FUNCTIONS:
+                if self._check(TokenType.LEFT_PAREN):
                     self.pos += 1
                     
                     # Handle special case for pow function which takes two arguments
-                    if token.value == "pow":
-                        arg1 = self.expression()
+                    if value == "pow":
+                        arg1 = self._parse()
                         
                         # Expect a comma
-                        if self.pos < len(self.tokens) and self.tokens[self.pos].type == TokenType.COMMA:
+                        if self._check(TokenType.COMMA):
                             self.pos += 1
-                            arg2 = self.expression()
+                            arg2 = self._parse()
                             
                             # Expect closing parenthesis
-                            if self.pos < len(self.tokens) and self.tokens[self.pos].type == TokenType.RIGHT_PAREN:
+                            if self._check(TokenType.RIGHT_PAREN):
                                 self.pos += 1
-                                return self.functions[token.value](arg1, arg2)
+                                if self._emit:
+                                    return f"{value}({arg1}, {arg2})"
+                                return _FUNCTIONS[value](arg1, arg2)
                             else:
                                 raise SyntaxError(f"Expected closing parenthesis after second pow argument at position {self.pos}")
                         else:
@@ -339,20 +465,49 @@ class Calculator:
                     
                     # Handle single argument functions
                     else:
-                        arg = self.expression()
-                        if self.pos < len(self.tokens) and self.tokens[self.pos].type == TokenType.RIGHT_PAREN:
+                        arg = self._parse()
+                        if self._check(TokenType.RIGHT_PAREN):
                             self.pos += 1
-                            return self.functions[token.value](arg)
+                            if self._emit:
+                                return f"{value}({arg})"
+                            return _FUNCTIONS[value](arg)
                         else:
                             raise SyntaxError(f"Expected closing parenthesis after function argument at position {self.pos}")
                 else:
                     raise SyntaxError(f"Expected opening parenthesis after function name at position {self.pos}")
             else:
-                raise NameError(f"Unknown identifier '{token.value}' at position {self.pos}")
+                raise NameError(f"Unknown identifier '{value}' at position {self.pos}")
+        
+        # Any other token has no value; applying an operator to it raises TypeError
+        return "None" if self._emit else None
+
+
+# Token count above which print_tokens skips the Rich table for a plain text block
+_TABLE_TOKEN_LIMIT = 200
+
+# Rich markup template per token type for the expression breakdown
+_TOK_FMT = defaultdict(lambda: "[magenta]{}[/]", {
+    **dict.fromkeys(_NUMBER_TYPES, "[cyan]{}[/]"),
+    **dict.fromkeys(_ARITHMETIC_OPS, "[yellow]{}[/]"),
+})
 
 
-def print_tokens(tokens: List[Token], console: Console):
-    """Print tokens in a visually appealing table format."""
+def print_tokens(tokens: TokenBuffer, console: Console, verbose: bool = True):
+    """Print tokens in a visually appealing table format.
+
+    Large token streams (or verbose=False) are printed as a single pre-formatted
+    block instead, since rendering a Rich table row by row dominates the runtime.
+    """
+    if not verbose or len(tokens) >= _TABLE_TOKEN_LIMIT:
+        rows = "\n".join(
+            f"{_TT_NAME[token_type]:<15}{value:<20}{line}:{column}"
+            for token_type, value, line, column in zip(tokens.types, tokens.values, tokens.lines, tokens.columns)
+            if token_type != TokenType.EOF  # Skip EOF for cleaner output
+        )
+        header = f"{'Type':<15}{'Value':<20}Position"
+        console.print(Panel(Text(f"{header}\n{rows}"), title="[bold blue]Tokens[/]", border_style="blue"))
+        return
+    
     table = Table(show_header=True, header_style="bold magenta", box=box.ROUNDED)
     table.add_column("Type", style="cyan")
     table.add_column("Value", style="green")
@@ -362,7 +517,7 @@ def print_tokens(tokens: List[Token], console: Console):
     for token in tokens:
         if token.type != TokenType.EOF:  # Skip EOF for cleaner output
             table.add_row(
-                token.type.name,
+                _TT_NAME[token.type],
                 token.value,
                 str(token.line),
                 str(token.column)
@@ -371,16 +526,16 @@ def print_tokens(tokens: List[Token], console: Console):
     console.print(Panel(table, title="[bold blue]Tokens[/]", border_style="blue"))
 
 
-def print_calculation_result(expression: str, result: float, tokens: List[Token], scan_time: float, calc_time: float, console: Console):
+def print_calculation_result(expression: str, result: float, tokens: TokenBuffer, scan_time: float, calc_time: float, console: Console):
     """Print calculation result with detailed information."""
     # Expression panel
     syntax = Syntax(expression, "python", theme="monokai", line_numbers=False)
     console.print(Panel(syntax, title="[bold green]Expression[/]", border_style="green"))
     
     # Create a visualization of the calculation process
-    token_display = " ".join([f"[cyan]{t.value}[/]" if t.type in [TokenType.INTEGER, TokenType.FLOAT] 
-                       else f"[yellow]{t.value}[/]" if t.type in [TokenType.PLUS, TokenType.MINUS, TokenType.MULTIPLY, TokenType.DIVIDE, TokenType.MODULO, TokenType.POWER] 
-                       else f"[magenta]{t.value}[/]" for t in tokens if t.type != TokenType.EOF])
+    token_display = " ".join(_TOK_FMT[token_type].format(value)
+                             for token_type, value in zip(tokens.types, tokens.values)
+                             if token_type is not TokenType.EOF)
     
     # Results table
     result_table = Table(show_header=False, box=box.SIMPLE_HEAD)
@@ -421,15 +576,15 @@ def run_calculator_demo(expression: str, console: Console):
     tokens, scan_time = lexer.scan_tokens()
     
     # Print tokens
-    print_tokens(tokens[:-1], console)  # Skip EOF token
+    print_tokens(tokens, console)
     
     try:
         # Calculate result
-        calculator = Calculator(tokens[:-1])  # Skip EOF token
+        calculator = Calculator(tokens)
         result, calc_time = calculator.calculate()
         
         # Print result
-        print_calculation_result(expression, result, tokens[:-1], scan_time, calc_time, console)
+        print_calculation_result(expression, result, tokens, scan_time, calc_time, console)
     except Exception as e:
         console.print(Panel(f"[bold red]Error:[/] {str(e)}", title="[bold red]Calculation Error[/]", border_style="red"))
 